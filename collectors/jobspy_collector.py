@@ -1,12 +1,33 @@
 import asyncio
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional
 from datetime import datetime
 import logging
+import pandas as pd
+import redis.asyncio as aioredis
+import xxhash
+from aiolimiter import AsyncLimiter
 from jobspy import scrape_jobs
-from tenacity import retry, stop_after_attempt, wait_exponential
+from redis.exceptions import RedisError, ResponseError
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
+
+from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Process-wide cap on in-flight JobSpy calls, shared by every collector run
+_SCRAPE_SEM = asyncio.BoundedSemaphore(settings.scrape_max_concurrent_requests)
+
+
+def _collector_fingerprint(job: Dict[str, Any]) -> str:
+    """Default dedup key: title|company|location, precomputed in _scrape_term"""
+    return job["_fingerprint"]
+
 
 class JobSpyCollector:
     """
@@ -39,118 +60,339 @@ class JobSpyCollector:
         "zip_recruiter": "ZIPRECRUITER",
     }
 
-    def __init__(self, proxy_url: Optional[str] = None):
+    # RedisBloom filter of fingerprints already collected by earlier runs.
+    # Rotated daily so jobs still listed get re-synced (last_seen_at) each day.
+    SEEN_FILTER_PREFIX = "jobs:seen"
+    SEEN_FILTER_ERROR_RATE = 0.001
+    SEEN_FILTER_CAPACITY = 1_000_000
+    SEEN_FILTER_TTL = 2 * 24 * 60 * 60
+
+    def __init__(self, proxy_url: Optional[str] = None, max_concurrency: int = 4):
         self.proxy_url = proxy_url
+        # Upper bound on search terms scraped at the same time
+        self.max_concurrency = max_concurrency
+        # Pace each site independently to its configured requests per minute
+        self.limiters = {
+            site: AsyncLimiter(
+                max_rate=getattr(settings, f"rate_limit_{site.replace('_', '')}"),
+                time_period=60,
+            )
+            for site in self.SOURCE_MAP
+        }
+        # Dedicated pool so per-site scrapes run side by side without
+        # starving the default executor used by the rest of the app
+        self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="jobspy")
+        # Cross-run dedup is only available when Redis is configured
+        self._redis = aioredis.from_url(settings.redis_url) if settings.redis_url else None
+        self._seen_filter_key: Optional[str] = None
 
     async def collect_jobs(
         self,
         sites: List[str] = ["linkedin", "indeed", "glassdoor", "zip_recruiter"],
         results_wanted: int = 50,
         hours_old: int = 24,
+        search_terms: Optional[List[str]] = None,
+        skip_previously_seen: bool = True,
+        errors: Optional[List[str]] = None,
+        dedup_key: Optional[Callable[[Dict[str, Any]], str]] = _collector_fingerprint,
+        skipped: Optional[List[str]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Collect jobs from specified sites for all search terms.
         Returns deduplicated list of raw job data.
         """
-        all_jobs: List[Dict[str, Any]] = []
-        seen_fingerprints: set = set()
+        return [
+            job
+            async for job in self.iter_jobs(
+                sites=sites,
+                results_wanted=results_wanted,
+                hours_old=hours_old,
+                search_terms=search_terms,
+                skip_previously_seen=skip_previously_seen,
+                errors=errors,
+                dedup_key=dedup_key,
+                skipped=skipped,
+            )
+        ]
 
-        for search_term in self.SEARCH_TERMS:
-            try:
-                jobs = await self._scrape_with_retry(
-                    sites=sites,
-                    search_term=search_term,
-                    results_wanted=results_wanted,
-                    hours_old=hours_old,
-                )
+    async def iter_jobs(
+        self,
+        sites: List[str] = ["linkedin", "indeed", "glassdoor", "zip_recruiter"],
+        results_wanted: int = 50,
+        hours_old: int = 24,
+        search_terms: Optional[List[str]] = None,
+        skip_previously_seen: bool = True,
+        errors: Optional[List[str]] = None,
+        dedup_key: Optional[Callable[[Dict[str, Any]], str]] = _collector_fingerprint,
+        skipped: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream deduplicated raw jobs as each search term finishes.
+        Search terms (default SEARCH_TERMS) are scraped concurrently,
+        bounded by max_concurrency. With skip_previously_seen jobs already
+        in the cross-run filter are dropped and, if given, their keys are
+        appended to skipped; the filter is only read here, callers add
+        jobs with mark_seen() once they are saved.
+        Failed searches are logged and, if given, appended to errors.
+        Jobs are deduplicated by dedup_key (title|company|location by
+        default), which also keys the cross-run filter; pass a caller key
+        to match how jobs are stored, or None to keep every job.
+        """
+        search_terms = search_terms or self.SEARCH_TERMS
+        sem = asyncio.BoundedSemaphore(self.max_concurrency)
 
+        async def scrape_term(search_term: str):
+            async with sem:
+                try:
+                    return search_term, await self._scrape_term(
+                        sites=sites,
+                        search_term=search_term,
+                        results_wanted=results_wanted,
+                        hours_old=hours_old,
+                        errors=errors,
+                    )
+                except Exception as e:
+                    logger.error(f"Error collecting jobs for '{search_term}': {e}")
+                    if errors is not None:
+                        errors.append(f"Error searching '{search_term}': {e}")
+                    return search_term, []
+
+        tasks = [asyncio.create_task(scrape_term(term)) for term in search_terms]
+
+        # Merge results one term at a time so the dedup set stays race-free
+        seen_keys: set = set()
+        total_unique = 0
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                search_term, jobs = await next_done
+
+                new_jobs: List[Dict[str, Any]] = []
+                new_keys: List[str] = []
                 for job in jobs:
-                    # Create fingerprint for deduplication
-                    fingerprint = self._create_fingerprint(job)
-                    if fingerprint not in seen_fingerprints:
-                        seen_fingerprints.add(fingerprint)
-                        job["_fingerprint"] = fingerprint
-                        job["_search_term"] = search_term
-                        all_jobs.append(job)
+                    key = (dedup_key or _collector_fingerprint)(job)
+                    if dedup_key is not None:
+                        if key in seen_keys:
+                            continue
+                        seen_keys.add(key)
+                    job["_search_term"] = search_term
+                    new_jobs.append(job)
+                    new_keys.append(key)
+
+                if skip_previously_seen:
+                    new_jobs = await self._filter_previously_seen(
+                        new_jobs, new_keys, skipped
+                    )
+                total_unique += len(new_jobs)
 
                 logger.info(
                     f"Collected {len(jobs)} jobs for '{search_term}' "
-                    f"({len(all_jobs)} total unique)"
+                    f"({total_unique} total unique)"
                 )
 
-                # Small delay between searches to avoid rate limiting
-                await asyncio.sleep(2)
+                for job in new_jobs:
+                    yield job
+        finally:
+            # Stop outstanding scrapes if the consumer bails out early
+            for task in tasks:
+                task.cancel()
+
+        logger.info(f"Total unique jobs collected: {total_unique}")
+
+    async def _filter_previously_seen(
+        self,
+        jobs: List[Dict[str, Any]],
+        keys: List[str],
+        skipped: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Drop jobs whose key was saved by an earlier run today.
+        Uses one read-only BF.MEXISTS round-trip per batch; falls back to
+        keeping every job if Redis or the RedisBloom module is unavailable.
+        Keys of dropped jobs are appended to skipped when given.
+        """
+        if self._redis is None or not jobs:
+            return jobs
 
-            except Exception as e:
-                logger.error(f"Error collecting jobs for '{search_term}': {e}")
-                continue
+        try:
+            key = await self._ensure_seen_filter()
+            exists = await self._redis.execute_command(
+                "BF.MEXISTS", key, *keys
+            )
+        except RedisError as e:
+            logger.warning(f"Seen-jobs filter unavailable, skipping cross-run dedup: {e}")
+            return jobs
 
-        logger.info(f"Total unique jobs collected: {len(all_jobs)}")
-        return all_jobs
+        if skipped is not None:
+            skipped.extend(k for k, seen in zip(keys, exists) if seen)
+        return [job for job, seen in zip(jobs, exists) if not seen]
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=30),
-    )
-    async def _scrape_with_retry(
+    async def mark_seen(self, fingerprints: List[str]):
+        """
+        Add dedup keys to today's filter. Call only after the jobs were
+        saved, so a failed save is retried by the next run.
+        """
+        if self._redis is None or not fingerprints:
+            return
+
+        try:
+            key = await self._ensure_seen_filter()
+            await self._redis.execute_command("BF.MADD", key, *fingerprints)
+        except RedisError as e:
+            logger.warning(f"Failed to update seen-jobs filter: {e}")
+
+    async def _ensure_seen_filter(self) -> str:
+        """Reserve today's bloom filter once and return its key"""
+        key = f"{self.SEEN_FILTER_PREFIX}:{datetime.utcnow():%Y%m%d}"
+        if key == self._seen_filter_key:
+            return key
+
+        try:
+            await self._redis.execute_command(
+                "BF.RESERVE", key, self.SEEN_FILTER_ERROR_RATE, self.SEEN_FILTER_CAPACITY
+            )
+            await self._redis.expire(key, self.SEEN_FILTER_TTL)
+        except ResponseError as e:
+            # Already reserved by an earlier run
+            if "exists" not in str(e).lower():
+                raise
+
+        self._seen_filter_key = key
+        return key
+
+    async def _scrape_term(
         self,
         sites: List[str],
         search_term: str,
         results_wanted: int,
         hours_old: int,
+        errors: Optional[List[str]] = None,
     ) -> List[Dict[str, Any]]:
         """
-        Scrape jobs with retry logic for resilience.
-        Runs in a thread pool since jobspy is synchronous.
+        Scrape all sites for one search term in parallel.
+        Results are concatenated once every site has finished; per-site
+        failures are appended to errors when given.
         """
-        loop = asyncio.get_event_loop()
-
-        def _scrape():
-            try:
-                # Build proxy config if available
-                proxies = None
-                if self.proxy_url:
-                    proxies = [self.proxy_url]
-
-                # Call JobSpy
-                jobs_df = scrape_jobs(
-                    site_name=sites,
+        frames = await asyncio.gather(
+            *(
+                self._scrape_with_retry(
+                    site=site,
                     search_term=search_term,
-                    location="Remote",
                     results_wanted=results_wanted,
                     hours_old=hours_old,
-                    country_indeed="USA",
-                    proxies=proxies,
-                    is_remote=True,
                 )
+                for site in sites
+            ),
+            return_exceptions=True,
+        )
 
-                if jobs_df is None or jobs_df.empty:
-                    return []
+        valid_frames = []
+        for site, frame in zip(sites, frames):
+            if isinstance(frame, Exception):
+                logger.error(f"Error collecting {site} jobs for '{search_term}': {frame}")
+                if errors is not None:
+                    errors.append(f"Error searching '{search_term}' on {site}: {frame}")
+            elif not frame.empty:
+                valid_frames.append(frame)
 
-                # Convert DataFrame to list of dicts
-                jobs = jobs_df.to_dict(orient="records")
-                return jobs
+        if not valid_frames:
+            return []
 
-            except Exception as e:
-                logger.error(f"JobSpy scrape error: {e}")
-                raise
+        jobs_df = pd.concat(valid_frames, ignore_index=True)
+        jobs_df["_fingerprint"] = self._create_fingerprints(jobs_df)
+
+        # Convert DataFrame to list of dicts
+        return jobs_df.to_dict(orient="records")
+
+    async def _scrape_with_retry(
+        self,
+        site: str,
+        search_term: str,
+        results_wanted: int,
+        hours_old: int,
+    ) -> pd.DataFrame:
+        """
+        Scrape a single site with retry logic for resilience.
+        Only network errors are retried (requests' exceptions subclass
+        OSError); parsing bugs fail fast with their original traceback.
+        Each attempt waits on the site's rate limiter, then runs in the
+        collector's thread pool since jobspy is synchronous.
+        """
+        loop = asyncio.get_running_loop()
+
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(3),
+            wait=wait_exponential(multiplier=1, min=4, max=30),
+            retry=retry_if_exception_type(OSError),
+            reraise=True,
+        ):
+            with attempt:
+                async with self._limiter(site), _SCRAPE_SEM:
+                    return await loop.run_in_executor(
+                        self._executor,
+                        self._scrape_one_site,
+                        site,
+                        search_term,
+                        results_wanted,
+                        hours_old,
+                    )
+
+    def _limiter(self, site: str) -> AsyncLimiter:
+        """Rate limiter for a site; sites without their own setting get the default rate"""
+        if site not in self.limiters:
+            self.limiters[site] = AsyncLimiter(max_rate=settings.rate_limit_default, time_period=60)
+        return self.limiters[site]
+
+    def _scrape_one_site(
+        self,
+        site: str,
+        search_term: str,
+        results_wanted: int,
+        hours_old: int,
+    ) -> pd.DataFrame:
+        """Blocking JobSpy call for a single site and search term"""
+        try:
+            # Build proxy config if available
+            proxies = None
+            if self.proxy_url:
+                proxies = [self.proxy_url]
+
+            # Call JobSpy
+            jobs_df = scrape_jobs(
+                site_name=[site],
+                search_term=search_term,
+                location="Remote",
+                results_wanted=results_wanted,
+                hours_old=hours_old,
+                country_indeed="USA",
+                proxies=proxies,
+                is_remote=True,
+            )
+
+            if jobs_df is None:
+                return pd.DataFrame()
+            return jobs_df
 
-        # Run synchronous scraping in thread pool
-        return await loop.run_in_executor(None, _scrape)
+        except Exception as e:
+            logger.error(f"JobSpy scrape error ({site}): {e}")
+            raise
 
-    def _create_fingerprint(self, job: Dict[str, Any]) -> str:
+    def _create_fingerprints(self, jobs_df: pd.DataFrame) -> pd.Series:
         """
-        Create a unique fingerprint for job deduplication.
-        Based on title + company + location.
+        Create unique fingerprints for job deduplication, one per row.
+        Based on title + company + location, built column-wise.
         """
-        import hashlib
+        def _key(column: str) -> pd.Series:
+            return jobs_df[column].fillna("").astype(str).str.strip()
 
-        title = str(job.get("title", "")).lower().strip()
-        company = str(job.get("company", "")).lower().strip()
-        location = str(job.get("location", "")).lower().strip()
+        combined = (_key("title") + "|" + _key("company") + "|" + _key("location")).str.lower()
+        return combined.map(xxhash.xxh3_128_hexdigest)
 
-        combined = f"{title}|{company}|{location}"
-        return hashlib.md5(combined.encode()).hexdigest()
+    async def aclose(self):
+        """Release the scrape thread pool and Redis connection"""
+        self._executor.shutdown(wait=False)
+        if self._redis is not None:
+            await self._redis.aclose()
 
     async def collect_single_source(
         self,
@@ -1,10 +1,20 @@
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings
 from typing import Optional
+import os
 
 
 class Settings(BaseSettings):
     # Database
     database_url: str = "postgresql://localhost:5432/closerjobs"
+    db_pool_min_size: int = 2
+    db_pool_max_size: int = Field(default_factory=lambda: min((os.cpu_count() or 1) * 2, 20))
+    db_statement_cache_size: int = 100
+    # Transaction-mode pgbouncer can't keep named prepared statements
+    db_pgbouncer: bool = False
+    # Recycle idle connections and long-lived ones to bound server-side memory
+    db_max_inactive_connection_lifetime: float = 300.0
+    db_max_queries: int = 50000
 
     # Redis (optional)
     redis_url: Optional[str] = None
@@ -18,12 +28,28 @@ class Settings(BaseSettings):
     # Scraping Configuration
     scrape_results_per_search: int = 50
     scrape_hours_old: int = 24
+    # Max JobSpy requests in flight across all concurrent runs
+    scrape_max_concurrent_requests: int = 8
 
     # Rate Limiting (requests per minute per source)
     rate_limit_linkedin: int = 5
     rate_limit_indeed: int = 10
     rate_limit_glassdoor: int = 8
     rate_limit_ziprecruiter: int = 10
+    # Any other JobSpy site (e.g. google)
+    rate_limit_default: int = 5
+
+    @model_validator(mode="after")
+    def check_db_pool_size(self) -> "Settings":
+        if self.db_pool_max_size < self.db_pool_min_size:
+            if "db_pool_max_size" in self.model_fields_set:
+                raise ValueError(
+                    f"DB_POOL_MAX_SIZE ({self.db_pool_max_size}) must be at least "
+                    f"DB_POOL_MIN_SIZE ({self.db_pool_min_size})"
+                )
+            # The CPU-based default never undercuts an explicit minimum
+            self.db_pool_max_size = self.db_pool_min_size
+        return self
 
     class Config:
         env_file = ".env"
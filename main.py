@@ -1,15 +1,30 @@
 from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime
+from typing import Any, Dict, Optional, List, Tuple
+from datetime import date, datetime
+from functools import lru_cache
+import asyncio
+import logging
+import math
 import os
+import re
 import hashlib
+import json
+import time
+
+from collectors import JobSpyCollector
+from config import settings
+from utils import Database
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="CloserJobs Scraper API",
     description="Job scraping service for remote sales closer positions",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # CORS
@@ -24,6 +39,21 @@ app.add_middleware(
 API_KEY = os.getenv("API_KEY", "closerjobs-scraper-key-2024")
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# /sync pipeline tuning
+PIPELINE_QUEUE_SIZE = 500
+PIPELINE_NORMALIZE_WORKERS = 4
+PIPELINE_BATCH_SIZE = 100
+PIPELINE_BATCH_MAX_WAIT = 0.05  # seconds
+_PIPELINE_DONE = object()
+
+_collector = JobSpyCollector(proxy_url=settings.proxy_url)
+
+# Strong references to in-flight background syncs so they aren't GC'd
+_background_syncs: set = set()
+
+# Serializes lazy pool creation so concurrent requests don't each open one
+_db_connect_lock = asyncio.Lock()
+
 
 # Auth dependency
 async def verify_api_key(x_api_key: str = Header(None)):
@@ -54,6 +84,13 @@ class SyncResponse(BaseModel):
     jobs_found: int
     jobs_added: int
     jobs_updated: int
+    jobs_skipped: int = 0
+    errors: List[str]
+
+
+class SyncStartedResponse(BaseModel):
+    success: bool
+    run_id: Optional[str] = None
     errors: List[str]
 
 
@@ -62,30 +99,90 @@ def generate_fingerprint(title: str, company: str, url: str) -> str:
     return hashlib.md5(data.encode()).hexdigest()
 
 
+SOURCE_MAP = {
+    "indeed": "INDEED",
+    "linkedin": "LINKEDIN",
+    "glassdoor": "GLASSDOOR",
+    "zip_recruiter": "ZIPRECRUITER",
+    "ziprecruiter": "ZIPRECRUITER",
+}
+
+# Job type phrases scanned in one pass. The lookahead lets overlapping
+# phrases (e.g. "base plus commission only") all be reported.
+_JOB_TYPE_RE = re.compile(
+    r"(?=(?P<COMMISSION_ONLY>commission only|100% commission)"
+    r"|(?P<BASE_PLUS_COMMISSION>base plus commission|base \+ commission|base salary)"
+    r"|(?P<CONTRACT>contract)"
+    r"|(?P<PART_TIME>part-time|part time))"
+)
+JOB_TYPE_PRIORITY = ["COMMISSION_ONLY", "BASE_PLUS_COMMISSION", "CONTRACT", "PART_TIME"]
+
+_OTE_RE = re.compile(r"\bote\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=None)
 def map_source(source: str) -> str:
-    source_map = {
-        "indeed": "INDEED",
-        "linkedin": "LINKEDIN",
-        "glassdoor": "GLASSDOOR",
-        "zip_recruiter": "ZIPRECRUITER",
-        "ziprecruiter": "ZIPRECRUITER",
-    }
-    return source_map.get(source.lower(), "MANUAL")
+    return SOURCE_MAP.get(source.lower(), "MANUAL")
 
 
+@lru_cache(maxsize=4096)
 def infer_job_type(title: str, description: str) -> str:
     text = f"{title} {description or ''}".lower()
-    if "commission only" in text or "100% commission" in text:
-        return "COMMISSION_ONLY"
-    if "base plus commission" in text or "base + commission" in text or "base salary" in text:
-        return "BASE_PLUS_COMMISSION"
-    if "contract" in text:
-        return "CONTRACT"
-    if "part-time" in text or "part time" in text:
-        return "PART_TIME"
+    found = {match.lastgroup for match in _JOB_TYPE_RE.finditer(text)}
+    for job_type in JOB_TYPE_PRIORITY:
+        if job_type in found:
+            return job_type
     return "FULL_TIME"
 
 
+async def _get_db() -> Optional[Database]:
+    """
+    Return the shared database pool, connecting on first use. If the
+    database was unreachable at startup (or since), each call retries,
+    so the service recovers on its own once Postgres is back.
+    """
+    if app.state.db is None and DATABASE_URL:
+        async with _db_connect_lock:
+            if app.state.db is None:
+                db = Database(
+                    DATABASE_URL,
+                    min_size=settings.db_pool_min_size,
+                    max_size=settings.db_pool_max_size,
+                    statement_cache_size=(
+                        0 if settings.db_pgbouncer else settings.db_statement_cache_size
+                    ),
+                    max_inactive_connection_lifetime=settings.db_max_inactive_connection_lifetime,
+                    max_queries=settings.db_max_queries,
+                )
+                try:
+                    await db.connect()
+                except Exception:
+                    # Database.connect logs the failure; the next call retries
+                    return None
+                app.state.db = db
+    return app.state.db
+
+
+@app.on_event("startup")
+async def startup():
+    """Open the shared database connection pool"""
+    app.state.db = None
+    await _get_db()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the shared database connection pool and scraper resources"""
+    # Let interrupted syncs record their runs as failed while the pool is still open
+    for task in list(_background_syncs):
+        task.cancel()
+    await asyncio.gather(*_background_syncs, return_exceptions=True)
+
+    await _collector.aclose()
+    if app.state.db is not None:
+        await app.state.db.disconnect()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -95,19 +192,16 @@ async def health_check():
 @app.get("/db-check")
 async def db_check():
     """Check database connection and job count"""
-    import psycopg2
     if not DATABASE_URL:
         return {"error": "DATABASE_URL not configured"}
+    db = await _get_db()
+    if db is None:
+        return {"error": "Database connection pool not available"}
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM jobs")
-        total = cur.fetchone()[0]
-        cur.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
-        by_status = dict(cur.fetchall())
-        cur.close()
-        conn.close()
-        return {"total_jobs": total, "by_status": by_status}
+        async with db.pool.acquire() as conn:
+            total = await conn.fetchval("SELECT COUNT(*) FROM jobs")
+            rows = await conn.fetch("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return {"total_jobs": total, "by_status": {row[0]: row[1] for row in rows}}
     except Exception as e:
         return {"error": str(e)}
 
@@ -131,42 +225,34 @@ async def collect_from_jobspy(
     jobs = []
 
     try:
-        from jobspy import scrape_jobs
-
-        search_terms = [
-            "sales closer remote",
-            "high ticket closer",
-            "appointment setter remote",
-            "remote sales representative",
-        ]
+        raw_jobs = await _collector.collect_jobs(
+            sites=sources,
+            results_wanted=results_wanted,
+            hours_old=hours_old,
+            # Limit to 2 searches to be faster
+            search_terms=JobSpyCollector.SEARCH_TERMS[:2],
+            # Previewing must not mark jobs as seen for the next /sync
+            skip_previously_seen=False,
+            errors=errors,
+            # Only dedup by URL below, as before the collector grew its own dedup
+            dedup_key=None,
+        )
 
-        for term in search_terms[:2]:  # Limit to 2 searches to be faster
-            try:
-                results = scrape_jobs(
-                    site_name=sources,
-                    search_term=term,
-                    location="remote",
-                    results_wanted=results_wanted,
-                    hours_old=hours_old,
-                    country_indeed="USA",
-                )
+        for row in raw_jobs:
+            company = row.get("company")
+            description = row.get("description")
+            url = row.get("job_url")
+            posted_date = row.get("date_posted")
+            jobs.append(JobResult(
+                title=str(row.get("title", "")),
+                company=str(company) if company else None,
+                location=str(row.get("location", "Remote")),
+                description=str(description)[:2000] if description else None,
+                url=str(url) if url else None,
+                source=str(row.get("site", "unknown")),
+                posted_date=str(posted_date) if posted_date else None,
+            ))
 
-                if results is not None and len(results) > 0:
-                    for _, row in results.iterrows():
-                        jobs.append(JobResult(
-                            title=str(row.get("title", "")),
-                            company=str(row.get("company", "")) if row.get("company") else None,
-                            location=str(row.get("location", "Remote")),
-                            description=str(row.get("description", ""))[:2000] if row.get("description") else None,
-                            url=str(row.get("job_url", "")) if row.get("job_url") else None,
-                            source=str(row.get("site", "unknown")),
-                            posted_date=str(row.get("date_posted", "")) if row.get("date_posted") else None,
-                        ))
-            except Exception as e:
-                errors.append(f"Error searching '{term}': {str(e)}")
-
-    except ImportError as e:
-        errors.append(f"JobSpy not available: {str(e)}")
     except Exception as e:
         errors.append(f"Scraping error: {str(e)}")
 
@@ -188,135 +274,303 @@ async def collect_from_jobspy(
     )
 
 
-@app.post("/sync", response_model=SyncResponse)
-async def sync_jobs(
-    results_wanted: int = 25,
-    hours_old: int = 72,
-):
+def _text(value: Any) -> Optional[str]:
+    """Return a raw JobSpy field as text, or None when missing/NaN"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return str(value) or None
+
+
+def _posted_at(value: Any) -> Optional[datetime]:
+    """Parse JobSpy's date_posted safely into a datetime"""
+    if _text(value) in (None, "None", "nan", "NaT"):
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _job_fingerprint(raw_job: Dict[str, Any]) -> str:
+    """Fingerprint a raw JobSpy job the way it is stored in the jobs table"""
+    return generate_fingerprint(
+        _text(raw_job.get("title")) or "",
+        _text(raw_job.get("company")),
+        _text(raw_job.get("job_url")),
+    )
+
+
+def _build_job_row(raw_job: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a raw JobSpy job into the values stored in the jobs table"""
+    title = _text(raw_job.get("title")) or ""
+    company = _text(raw_job.get("company"))
+    description = _text(raw_job.get("description"))
+    if description:
+        description = description[:2000]
+    url = _text(raw_job.get("job_url"))
+
+    return {
+        "title": title,
+        "company": company or "Unknown Company",
+        "description": description or "No description available",
+        "location": _text(raw_job.get("location")) or "Remote",
+        "source": map_source(_text(raw_job.get("site")) or ""),
+        "url": url,
+        "fingerprint": _job_fingerprint(raw_job),
+        "job_type": infer_job_type(title, description),
+        "posted_at": _posted_at(raw_job.get("date_posted")),
+        "ote_based": bool(_OTE_RE.search(description or "")),
+    }
+
+
+# jobs columns written by _save_job_rows, and the job row key feeding each one
+SAVE_JOB_COLUMNS = (
+    ("title", "title"),
+    ("company_name", "company"),
+    ("description", "description"),
+    ("location", "location"),
+    ("source", "source"),
+    ("source_url", "url"),
+    ("fingerprint", "fingerprint"),
+    ("job_type", "job_type"),
+    ("posted_at", "posted_at"),
+    ("ote_based", "ote_based"),
+)
+
+SAVE_JOBS_SQL = """
+    INSERT INTO jobs (
+        id, {columns}, status, last_seen_at, created_at, updated_at
+    )
+    SELECT gen_random_uuid(), {columns}, 'ACTIVE', NOW(), NOW(), NOW()
+    FROM {source}
+    ON CONFLICT (fingerprint) DO UPDATE SET last_seen_at = NOW()
+    RETURNING (xmax = 0) AS inserted
+"""
+
+
+async def _save_job_rows(db: Database, rows: List[Dict[str, Any]]) -> Tuple[int, int, List[str]]:
     """
-    Scrape jobs and save directly to database.
+    Insert new jobs and refresh last_seen_at on existing ones in a single
+    statement. Returns (jobs_added, jobs_updated, errors).
     """
-    import psycopg2
-    from psycopg2.extras import execute_values
+    columns = tuple(column for column, _ in SAVE_JOB_COLUMNS)
+    values = [[row[key] for row in rows] for _, key in SAVE_JOB_COLUMNS]
 
-    errors = []
-    jobs_found = 0
-    jobs_added = 0
-    jobs_updated = 0
+    try:
+        async with db.pool.acquire() as conn:
+            query = SAVE_JOBS_SQL.format(
+                columns=", ".join(columns),
+                source=await db.jobs_unnest_source(conn, columns),
+            )
+            # xmax is 0 only on freshly inserted rows
+            results = await conn.fetch(query, *values)
+    except Exception as e:
+        return 0, 0, [f"Error saving {len(rows)} jobs: {str(e)}"]
 
-    if not DATABASE_URL:
-        return SyncResponse(
-            success=False,
-            jobs_found=0,
-            jobs_added=0,
-            jobs_updated=0,
-            errors=["DATABASE_URL not configured"],
-        )
+    added = sum(1 for row in results if row["inserted"])
+    return added, len(results) - added, []
 
-    # First, scrape jobs
-    scrape_result = await collect_from_jobspy(
-        sources=["indeed", "linkedin"],
-        results_wanted=results_wanted,
-        hours_old=hours_old,
+
+async def _run_sync_pipeline(db: Database, results_wanted: int, hours_old: int) -> SyncResponse:
+    """
+    Scrape, normalize and save jobs as three overlapping stages.
+    Stages are connected by bounded queues, so saving starts as soon as
+    the first search term finishes instead of after the whole scrape.
+    """
+    raw_queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    row_queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    result = SyncResponse(
+        success=False,
+        jobs_found=0,
+        jobs_added=0,
+        jobs_updated=0,
+        errors=[],
     )
 
-    jobs_found = scrape_result.count
-    errors.extend(scrape_result.errors)
+    async def scrape():
+        skipped: List[str] = []
+        async for raw_job in _collector.iter_jobs(
+            sites=["indeed", "linkedin"],
+            results_wanted=results_wanted,
+            hours_old=hours_old,
+            errors=result.errors,
+            # Dedup like the jobs table does (title-company-url), not by location
+            dedup_key=_job_fingerprint,
+            skipped=skipped,
+        ):
+            result.jobs_found += 1
+            await raw_queue.put(raw_job)
+        result.jobs_skipped = len(skipped)
+        for _ in range(PIPELINE_NORMALIZE_WORKERS):
+            await raw_queue.put(_PIPELINE_DONE)
+
+    async def normalize():
+        while (raw_job := await raw_queue.get()) is not _PIPELINE_DONE:
+            await row_queue.put(_build_job_row(raw_job))
+
+    async def normalize_all():
+        await asyncio.gather(*(normalize() for _ in range(PIPELINE_NORMALIZE_WORKERS)))
+        await row_queue.put(_PIPELINE_DONE)
+
+    async def flush(batch: List[Dict[str, Any]]):
+        added, updated, errors = await _save_job_rows(db, batch)
+        result.jobs_added += added
+        result.jobs_updated += updated
+        result.errors.extend(errors)
+        # Only saved jobs are skipped by later runs; failed batches are retried
+        if not errors:
+            await _collector.mark_seen([row["fingerprint"] for row in batch])
+
+    async def save():
+        loop = asyncio.get_running_loop()
+        seen_fingerprints = set()
+        batch: List[Dict[str, Any]] = []
+        deadline = None
+        done = False
+
+        while not done:
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            try:
+                row = await asyncio.wait_for(row_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                row = None
+
+            if row is _PIPELINE_DONE:
+                done = True
+            elif row is not None and row["fingerprint"] not in seen_fingerprints:
+                seen_fingerprints.add(row["fingerprint"])
+                if not batch:
+                    deadline = loop.time() + PIPELINE_BATCH_MAX_WAIT
+                batch.append(row)
+
+            # Flush on a full batch, an expired wait, or end of input
+            if batch and (
+                done or len(batch) >= PIPELINE_BATCH_SIZE or loop.time() >= deadline
+            ):
+                await flush(batch)
+                batch = []
+                deadline = None
+
+    tasks = [
+        asyncio.create_task(scrape()),
+        asyncio.create_task(normalize_all()),
+        asyncio.create_task(save()),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # A failed stage would otherwise leave the others blocked on a queue
+        for task in tasks:
+            task.cancel()
+
+    return result
 
-    if not scrape_result.jobs:
-        return SyncResponse(
-            success=False,
-            jobs_found=0,
-            jobs_added=0,
-            jobs_updated=0,
-            errors=errors or ["No jobs found"],
-        )
 
-    # Connect to database and save jobs
+async def _run_sync_in_background(db: Database, run_id: str, results_wanted: int, hours_old: int):
+    """Run the /sync pipeline and record the outcome on its scraping run"""
+    started_at = time.monotonic()
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
+        result = await _run_sync_pipeline(db, results_wanted, hours_old)
+        if not result.jobs_found and not result.jobs_skipped:
+            result.errors = result.errors or ["No jobs found"]
+        # A repeat run whose jobs were all saved earlier today has nothing to do
+        all_seen = not result.jobs_found and result.jobs_skipped > 0
+        result.success = result.jobs_added > 0 or result.jobs_updated > 0 or all_seen
+        logger.info(
+            f"Sync run {run_id}: {result.jobs_found} found, "
+            f"{result.jobs_skipped} skipped as already seen"
+        )
+    except asyncio.CancelledError:
+        logger.warning(f"Sync run {run_id} interrupted by shutdown")
+        await _record_sync_run(db, run_id, _failed_sync("Sync interrupted by shutdown"), started_at)
+        raise
+    except Exception as e:
+        logger.error(f"Sync run {run_id} failed: {e}")
+        result = _failed_sync(f"Sync error: {str(e)}")
 
-        for job in scrape_result.jobs:
-            try:
-                fingerprint = generate_fingerprint(job.title, job.company, job.url)
-                source = map_source(job.source)
-                job_type = infer_job_type(job.title, job.description)
-
-                # Check if exists
-                cur.execute("SELECT id FROM jobs WHERE fingerprint = %s", (fingerprint,))
-                existing = cur.fetchone()
-
-                # Parse posted_date safely
-                posted_at = None
-                if job.posted_date and job.posted_date not in ("None", "nan", "NaT", ""):
-                    try:
-                        posted_at = job.posted_date
-                    except:
-                        posted_at = None
-
-                if existing:
-                    # Update last_seen_at
-                    cur.execute(
-                        "UPDATE jobs SET last_seen_at = NOW() WHERE id = %s",
-                        (existing[0],)
-                    )
-                    jobs_updated += 1
-                else:
-                    # Insert new job
-                    cur.execute("""
-                        INSERT INTO jobs (
-                            id, title, company_name, description, location,
-                            source, source_url, fingerprint, job_type, status,
-                            posted_at, last_seen_at, ote_based, created_at, updated_at
-                        ) VALUES (
-                            gen_random_uuid(), %s, %s, %s, %s,
-                            %s, %s, %s, %s, 'ACTIVE',
-                            %s, NOW(), %s, NOW(), NOW()
-                        )
-                    """, (
-                        job.title,
-                        job.company or "Unknown Company",
-                        job.description or "No description available",
-                        job.location or "Remote",
-                        source,
-                        job.url,
-                        fingerprint,
-                        job_type,
-                        posted_at,
-                        "ote" in (job.description or "").lower(),
-                    ))
-                    jobs_added += 1
-
-                conn.commit()  # Commit each job individually
-
-            except Exception as e:
-                conn.rollback()  # Rollback failed job
-                errors.append(f"Error saving job '{job.title}': {str(e)}")
-
-        cur.close()
-        conn.close()
+    await _record_sync_run(db, run_id, result, started_at)
+
+
+def _failed_sync(error: str) -> SyncResponse:
+    return SyncResponse(
+        success=False,
+        jobs_found=0,
+        jobs_added=0,
+        jobs_updated=0,
+        errors=[error],
+    )
 
+
+async def _record_sync_run(db: Database, run_id: str, result: SyncResponse, started_at: float):
+    """Store a finished sync's outcome on its scraping run"""
+    try:
+        await db.complete_scraping_run(
+            run_id,
+            status="COMPLETED" if result.success else "FAILED",
+            jobs_found=result.jobs_found,
+            jobs_added=result.jobs_added,
+            jobs_updated=result.jobs_updated,
+            errors=result.errors,
+            duration=int(time.monotonic() - started_at),
+        )
     except Exception as e:
-        errors.append(f"Database error: {str(e)}")
-        return SyncResponse(
+        logger.error(f"Failed to record sync run {run_id}: {e}")
+
+
+@app.post("/sync", response_model=SyncStartedResponse)
+async def sync_jobs(
+    results_wanted: int = 25,
+    hours_old: int = 72,
+):
+    """
+    Start a background run that scrapes jobs and saves them to the database.
+    Returns immediately with a run_id; poll /runs/{run_id} for the outcome.
+    """
+    if not DATABASE_URL:
+        return SyncStartedResponse(success=False, errors=["DATABASE_URL not configured"])
+
+    db = await _get_db()
+    if db is None:
+        return SyncStartedResponse(
             success=False,
-            jobs_found=jobs_found,
-            jobs_added=jobs_added,
-            jobs_updated=jobs_updated,
-            errors=errors,
+            errors=["Database error: connection pool not available"],
         )
 
-    return SyncResponse(
-        success=jobs_added > 0 or jobs_updated > 0,
-        jobs_found=jobs_found,
-        jobs_added=jobs_added,
-        jobs_updated=jobs_updated,
-        errors=errors,
+    try:
+        run_id = await db.create_scraping_run("JOBSPY")
+    except Exception as e:
+        return SyncStartedResponse(success=False, errors=[f"Database error: {str(e)}"])
+
+    task = asyncio.create_task(
+        _run_sync_in_background(db, run_id, results_wanted, hours_old)
     )
+    _background_syncs.add(task)
+    task.add_done_callback(_background_syncs.discard)
+
+    return SyncStartedResponse(success=True, run_id=run_id, errors=[])
+
+
+@app.get("/runs/{run_id}")
+async def get_run(run_id: str):
+    """Get the status of a sync run"""
+    db = await _get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    run = await db.get_scraping_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    # jsonb comes back from asyncpg as text
+    if isinstance(run.get("errors"), str):
+        run["errors"] = json.loads(run["errors"])
+    return run
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8080))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(app, host="0.0.0.0", port=port, loop="uvloop", http="httptools")
@@ -0,0 +1,51 @@
+import warnings
+
+from utils.normalizer import JobNormalizer
+
+
+def test_normalize_batch_without_salaries():
+    jobs = [
+        {"title": "T", "description": "no pay info", "site": "indeed"},
+        {"title": "U", "description": "commission only", "site": "linkedin"},
+    ]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        normalized = JobNormalizer().normalize_batch(jobs)
+
+    assert [job["salary_min"] for job in normalized] == [None, None]
+    assert [job["salary_max"] for job in normalized] == [None, None]
+
+
+def test_normalize_batch_matches_normalize_for_salary_text():
+    normalizer = JobNormalizer()
+    jobs = [
+        {"title": "A", "description": "Pay $50K - $80K base", "site": "indeed"},
+        {"title": "B", "description": "earn 50,000 - 90,000 per year", "site": "indeed"},
+        {"title": "C", "description": "no pay info", "site": "indeed"},
+    ]
+
+    batch = normalizer.normalize_batch(jobs)
+
+    for job, normalized in zip(jobs, batch):
+        expected = normalizer.normalize(job)
+        assert (normalized["salary_min"], normalized["salary_max"]) == (
+            expected["salary_min"],
+            expected["salary_max"],
+        )
+
+
+def test_normalize_batch_matches_normalize_for_missing_values():
+    normalizer = JobNormalizer()
+    jobs = [
+        {"title": "A", "company": None, "description": None, "site": "indeed"},
+        {"title": "B", "company": float("nan"), "description": float("nan"), "site": "indeed"},
+        {"title": "C", "company": "Acme", "description": "commission only", "site": "indeed"},
+    ]
+
+    batch = normalizer.normalize_batch(jobs)
+
+    for job, normalized in zip(jobs, batch):
+        expected = normalizer.normalize(job)
+        for field in ("company_name", "description", "location", "fingerprint", "job_type"):
+            assert normalized[field] == expected[field]
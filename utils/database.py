@@ -3,10 +3,118 @@ from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import json
 import logging
-import uuid
 
 logger = logging.getLogger(__name__)
 
+# Columns bound by upsert_jobs, in UNNEST array order
+UPSERT_JOB_COLUMNS = (
+    "company_name", "title", "description", "requirements",
+    "location", "job_type", "salary_min", "salary_max", "commission_info",
+    "application_url", "application_email", "source", "source_url",
+    "fingerprint", "posted_at", "last_seen_at",
+)
+UPSERT_JOB_COLUMN_LIST = ", ".join(UPSERT_JOB_COLUMNS)
+
+# Batches larger than this are staged with COPY instead of bound as arrays
+BULK_UPSERT_THRESHOLD = 1000
+
+CREATE_SCRAPING_RUN_SQL = """
+    INSERT INTO scraping_runs (id, source, status, started_at, jobs_found, jobs_added, jobs_updated)
+    VALUES (gen_random_uuid()::text, $1, 'RUNNING', $2, 0, 0, 0)
+    RETURNING id
+"""
+
+COMPLETE_SCRAPING_RUN_SQL = """
+    UPDATE scraping_runs
+    SET status = $2,
+        jobs_found = $3,
+        jobs_added = $4,
+        jobs_updated = $5,
+        errors = $6,
+        completed_at = $7,
+        duration = $8
+    WHERE id = $1
+"""
+
+GET_SCRAPING_RUN_SQL = """
+    SELECT id, source, status, started_at, completed_at,
+           jobs_found, jobs_added, jobs_updated, errors, duration
+    FROM scraping_runs
+    WHERE id = $1
+"""
+
+JOB_COLUMN_TYPES_SQL = """
+    SELECT attname, format_type(atttypid, atttypmod) AS type
+    FROM pg_attribute
+    WHERE attrelid = 'jobs'::regclass AND attnum > 0 AND NOT attisdropped
+"""
+
+# Filled in with the row source: typed UNNEST arrays or the COPY staging table
+UPSERT_JOBS_SQL = """
+    INSERT INTO jobs (id, {columns}, status, created_at, updated_at)
+    SELECT gen_random_uuid(), {columns}, 'ACTIVE', last_seen_at, last_seen_at
+    FROM {source}
+    ON CONFLICT (fingerprint) DO UPDATE
+    SET title = EXCLUDED.title,
+        description = EXCLUDED.description,
+        requirements = EXCLUDED.requirements,
+        location = EXCLUDED.location,
+        job_type = EXCLUDED.job_type,
+        salary_min = EXCLUDED.salary_min,
+        salary_max = EXCLUDED.salary_max,
+        commission_info = EXCLUDED.commission_info,
+        application_url = EXCLUDED.application_url,
+        source_url = EXCLUDED.source_url,
+        last_seen_at = EXCLUDED.last_seen_at,
+        updated_at = EXCLUDED.updated_at
+    RETURNING (xmax = 0) AS inserted
+"""
+
+# Staging table for COPY: same column types as jobs, no constraints or defaults
+CREATE_JOBS_STAGE_SQL = f"""
+    CREATE TEMP TABLE jobs_stage ON COMMIT DROP AS
+    SELECT {UPSERT_JOB_COLUMN_LIST} FROM jobs WITH NO DATA
+"""
+
+UPSERT_JOBS_FROM_STAGE_SQL = UPSERT_JOBS_SQL.format(
+    columns=UPSERT_JOB_COLUMN_LIST, source="jobs_stage"
+)
+
+STATS_SQL = """
+    WITH total AS (
+        SELECT COUNT(*) AS c FROM jobs WHERE status = 'ACTIVE'
+    ), today AS (
+        SELECT COUNT(*) AS c FROM jobs WHERE created_at >= CURRENT_DATE
+    ), by_source AS (
+        SELECT json_object_agg(source, c) AS o
+        FROM (
+            SELECT source, COUNT(*) AS c
+            FROM jobs
+            WHERE status = 'ACTIVE'
+            GROUP BY source
+        ) s
+    ), recent AS (
+        SELECT json_agg(r) AS o
+        FROM (
+            SELECT id, source, status, jobs_found, jobs_added, started_at, duration
+            FROM scraping_runs
+            ORDER BY started_at DESC
+            LIMIT 10
+        ) r
+    )
+    SELECT (SELECT c FROM total) AS total_active_jobs,
+           (SELECT c FROM today) AS jobs_added_today,
+           (SELECT o FROM by_source) AS jobs_by_source,
+           (SELECT o FROM recent) AS recent_runs
+"""
+
+MARK_STALE_JOBS_SQL = """
+    UPDATE jobs
+    SET status = 'EXPIRED'
+    WHERE last_seen_at < NOW() - make_interval(days => $1)
+    AND status = 'ACTIVE'
+"""
+
 
 class Database:
     """
@@ -14,24 +122,50 @@ class Database:
     Handles job storage and scraping run tracking.
     """
 
-    def __init__(self, database_url: str):
+    def __init__(
+        self,
+        database_url: str,
+        min_size: int = 2,
+        max_size: int = 10,
+        statement_cache_size: int = 100,
+        max_inactive_connection_lifetime: float = 300.0,
+        max_queries: int = 50000,
+    ):
         self.database_url = database_url
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.max_inactive_connection_lifetime = max_inactive_connection_lifetime
+        self.max_queries = max_queries
         self.pool: Optional[asyncpg.Pool] = None
+        self._job_column_types: Optional[Dict[str, str]] = None
+        self._upsert_jobs_query: Optional[str] = None
 
     async def connect(self):
         """Establish database connection pool"""
         try:
             self.pool = await asyncpg.create_pool(
                 self.database_url,
-                min_size=2,
-                max_size=10,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                statement_cache_size=self.statement_cache_size,
+                max_inactive_connection_lifetime=self.max_inactive_connection_lifetime,
+                max_queries=self.max_queries,
                 command_timeout=60,
+                init=self._init_connection,
             )
             logger.info("Database connection pool established")
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
 
+    @staticmethod
+    async def _init_connection(conn: asyncpg.Connection):
+        """Decode json columns into Python objects on every new pool connection"""
+        await conn.set_type_codec(
+            "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        )
+
     async def disconnect(self):
         """Close database connection pool"""
         if self.pool:
@@ -51,17 +185,8 @@ class Database:
 
     async def create_scraping_run(self, source: str) -> str:
         """Create a new scraping run record"""
-        run_id = str(uuid.uuid4())[:8]
-
-        query = """
-            INSERT INTO scraping_runs (id, source, status, started_at, jobs_found, jobs_added, jobs_updated)
-            VALUES ($1, $2, 'RUNNING', $3, 0, 0, 0)
-        """
-
         async with self.pool.acquire() as conn:
-            await conn.execute(query, run_id, source, datetime.utcnow())
-
-        return run_id
+            return await conn.fetchval(CREATE_SCRAPING_RUN_SQL, source, datetime.utcnow())
 
     async def complete_scraping_run(
         self,
@@ -74,21 +199,9 @@ class Database:
         duration: int,
     ):
         """Update scraping run with completion status"""
-        query = """
-            UPDATE scraping_runs
-            SET status = $2,
-                jobs_found = $3,
-                jobs_added = $4,
-                jobs_updated = $5,
-                errors = $6,
-                completed_at = $7,
-                duration = $8
-            WHERE id = $1
-        """
-
         async with self.pool.acquire() as conn:
             await conn.execute(
-                query,
+                COMPLETE_SCRAPING_RUN_SQL,
                 run_id,
                 status,
                 jobs_found,
@@ -101,15 +214,8 @@ class Database:
 
     async def get_scraping_run(self, run_id: str) -> Optional[Dict[str, Any]]:
         """Get scraping run by ID"""
-        query = """
-            SELECT id, source, status, started_at, completed_at,
-                   jobs_found, jobs_added, jobs_updated, errors, duration
-            FROM scraping_runs
-            WHERE id = $1
-        """
-
         async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(query, run_id)
+            row = await conn.fetchrow(GET_SCRAPING_RUN_SQL, run_id)
             if row:
                 return dict(row)
             return None
@@ -122,145 +228,109 @@ class Database:
         if not jobs:
             return 0, 0
 
-        jobs_added = 0
-        jobs_updated = 0
+        # One logical "now" for the whole batch
+        now = datetime.utcnow()
 
-        async with self.pool.acquire() as conn:
-            for job in jobs:
-                try:
-                    # Check if job exists by fingerprint
-                    existing = await conn.fetchval(
-                        "SELECT id FROM jobs WHERE fingerprint = $1",
-                        job["fingerprint"],
-                    )
-
-                    if existing:
-                        # Update existing job
-                        await conn.execute(
-                            """
-                            UPDATE jobs
-                            SET title = $2,
-                                description = $3,
-                                requirements = $4,
-                                location = $5,
-                                job_type = $6,
-                                salary_min = $7,
-                                salary_max = $8,
-                                commission_info = $9,
-                                application_url = $10,
-                                source_url = $11,
-                                last_seen_at = $12,
-                                updated_at = $12
-                            WHERE fingerprint = $1
-                            """,
-                            job["fingerprint"],
-                            job["title"],
-                            job["description"],
-                            job.get("requirements"),
-                            job["location"],
-                            job["job_type"],
-                            job.get("salary_min"),
-                            job.get("salary_max"),
-                            job.get("commission_info"),
-                            job.get("application_url"),
-                            job.get("source_url"),
-                            datetime.utcnow(),
-                        )
-                        jobs_updated += 1
-                    else:
-                        # Insert new job
-                        job_id = str(uuid.uuid4())[:25]
-                        await conn.execute(
-                            """
-                            INSERT INTO jobs (
-                                id, company_name, title, description, requirements,
-                                location, job_type, salary_min, salary_max, commission_info,
-                                application_url, application_email, source, source_url,
-                                fingerprint, status, posted_at, last_seen_at, created_at, updated_at
-                            ) VALUES (
-                                $1, $2, $3, $4, $5, $6, $7, $8, $9, $10,
-                                $11, $12, $13, $14, $15, 'ACTIVE', $16, $17, $17, $17
-                            )
-                            """,
-                            job_id,
-                            job["company_name"],
-                            job["title"],
-                            job["description"],
-                            job.get("requirements"),
-                            job["location"],
-                            job["job_type"],
-                            job.get("salary_min"),
-                            job.get("salary_max"),
-                            job.get("commission_info"),
-                            job.get("application_url"),
-                            job.get("application_email"),
-                            job["source"],
-                            job.get("source_url"),
-                            job["fingerprint"],
-                            job.get("posted_at", datetime.utcnow()),
-                            datetime.utcnow(),
-                        )
-                        jobs_added += 1
-
-                except Exception as e:
-                    logger.error(f"Error upserting job {job.get('title')}: {e}")
-                    continue
+        # ON CONFLICT cannot touch the same row twice in one statement,
+        # so keep only the last job per fingerprint
+        unique_jobs = {job["fingerprint"]: job for job in jobs}.values()
+
+        rows = [
+            (
+                job["company_name"],
+                job["title"],
+                job["description"],
+                job.get("requirements"),
+                job["location"],
+                job["job_type"],
+                job.get("salary_min"),
+                job.get("salary_max"),
+                job.get("commission_info"),
+                job.get("application_url"),
+                job.get("application_email"),
+                job["source"],
+                job.get("source_url"),
+                job["fingerprint"],
+                job.get("posted_at", now),
+                now,
+            )
+            for job in unique_jobs
+        ]
+
+        try:
+            async with self.pool.acquire() as conn:
+                if len(rows) > BULK_UPSERT_THRESHOLD:
+                    results = await self._upsert_jobs_bulk(conn, rows)
+                else:
+                    query = await self._get_upsert_jobs_query(conn)
+                    columns = [list(column) for column in zip(*rows)]
+                    # One statement is one implicit transaction: the whole batch
+                    # commits (and fsyncs) once, all or nothing
+                    results = await conn.fetch(query, *columns)
+        except Exception as e:
+            logger.error(f"Error upserting {len(jobs)} jobs: {e}")
+            return 0, 0
+
+        jobs_added = sum(1 for row in results if row["inserted"])
+        jobs_updated = len(results) - jobs_added
 
         logger.info(f"Upserted jobs: {jobs_added} added, {jobs_updated} updated")
         return jobs_added, jobs_updated
 
-    async def get_stats(self) -> Dict[str, Any]:
-        """Get scraping statistics"""
-        async with self.pool.acquire() as conn:
-            # Total jobs
-            total_jobs = await conn.fetchval(
-                "SELECT COUNT(*) FROM jobs WHERE status = 'ACTIVE'"
-            )
+    async def jobs_unnest_source(self, conn: asyncpg.Connection, columns: Tuple[str, ...]) -> str:
+        """
+        FROM-clause source that unpacks one bound array per jobs column,
+        as UNNEST($1::type[], ...) AS u(columns). Array casts are read from
+        the jobs table once, so enum and timestamp columns bind without
+        guessing type names.
+        """
+        if self._job_column_types is None:
+            rows = await conn.fetch(JOB_COLUMN_TYPES_SQL)
+            self._job_column_types = {row["attname"]: row["type"] for row in rows}
 
-            # Jobs by source
-            jobs_by_source = await conn.fetch(
-                """
-                SELECT source, COUNT(*) as count
-                FROM jobs
-                WHERE status = 'ACTIVE'
-                GROUP BY source
-                """
-            )
+        arrays = ", ".join(
+            f"${i}::{self._job_column_types[column]}[]" for i, column in enumerate(columns, 1)
+        )
+        return f"UNNEST({arrays}) AS u({', '.join(columns)})"
 
-            # Recent runs
-            recent_runs = await conn.fetch(
-                """
-                SELECT id, source, status, jobs_found, jobs_added, started_at, duration
-                FROM scraping_runs
-                ORDER BY started_at DESC
-                LIMIT 10
-                """
+    async def _get_upsert_jobs_query(self, conn: asyncpg.Connection) -> str:
+        """Build the UNNEST upsert once per Database"""
+        if self._upsert_jobs_query is None:
+            self._upsert_jobs_query = UPSERT_JOBS_SQL.format(
+                columns=UPSERT_JOB_COLUMN_LIST,
+                source=await self.jobs_unnest_source(conn, UPSERT_JOB_COLUMNS),
             )
+        return self._upsert_jobs_query
 
-            # Jobs added today
-            jobs_today = await conn.fetchval(
-                """
-                SELECT COUNT(*) FROM jobs
-                WHERE created_at >= CURRENT_DATE
-                """
+    async def _upsert_jobs_bulk(
+        self, conn: asyncpg.Connection, rows: List[tuple]
+    ) -> List[asyncpg.Record]:
+        """
+        Upsert a large batch by COPYing it into a temporary staging table
+        and merging from there in one statement.
+        """
+        async with conn.transaction():
+            await conn.execute(CREATE_JOBS_STAGE_SQL)
+            await conn.copy_records_to_table(
+                "jobs_stage", records=rows, columns=UPSERT_JOB_COLUMNS
             )
+            return await conn.fetch(UPSERT_JOBS_FROM_STAGE_SQL)
 
-            return {
-                "total_active_jobs": total_jobs,
-                "jobs_added_today": jobs_today,
-                "jobs_by_source": {row["source"]: row["count"] for row in jobs_by_source},
-                "recent_runs": [dict(row) for row in recent_runs],
-            }
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get scraping statistics"""
+        # One round trip; json columns are decoded by the codec set in _init_connection
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(STATS_SQL)
+
+        return {
+            "total_active_jobs": row["total_active_jobs"],
+            "jobs_added_today": row["jobs_added_today"],
+            "jobs_by_source": row["jobs_by_source"] or {},
+            "recent_runs": row["recent_runs"] or [],
+        }
 
     async def mark_stale_jobs(self, days_old: int = 30):
         """Mark jobs not seen in X days as expired"""
-        query = """
-            UPDATE jobs
-            SET status = 'EXPIRED'
-            WHERE last_seen_at < NOW() - INTERVAL '%s days'
-            AND status = 'ACTIVE'
-        """
-
         async with self.pool.acquire() as conn:
-            result = await conn.execute(query, days_old)
+            result = await conn.execute(MARK_STALE_JOBS_SQL, days_old)
             logger.info(f"Marked stale jobs as expired: {result}")
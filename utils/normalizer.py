@@ -1,11 +1,34 @@
+import asyncio
 import re
-from typing import Dict, Any, Optional
-from datetime import datetime
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+from datetime import date, datetime, timezone
 import logging
+import numpy as np
+import pandas as pd
+import xxhash
+from selectolax.lexbor import LexborHTMLParser
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class JobKey:
+    """
+    Lowercased identity fields of a job, computed once and shared by
+    fingerprinting and any other dedup logic. Fields are expected to be
+    cleaned (and so already stripped) by JobNormalizer.
+    """
+    title_lc: str
+    company_lc: str
+    location_lc: str
+
+    @classmethod
+    def from_fields(cls, title: str, company: str, location: str) -> "JobKey":
+        return cls(title.lower(), company.lower(), location.lower())
+
+
 class JobNormalizer:
     """
     Normalizes raw job data from various sources to a standard schema.
@@ -43,18 +66,67 @@ class JobNormalizer:
         "on target earnings",
     ]
 
+    # Each keyword list as one case-insensitive alternation (plain substring matches)
+    COMMISSION_ONLY_PATTERN = re.compile(
+        "|".join(map(re.escape, COMMISSION_ONLY_KEYWORDS)), re.IGNORECASE
+    )
+    BASE_PLUS_COMMISSION_PATTERN = re.compile(
+        "|".join(map(re.escape, BASE_PLUS_COMMISSION_KEYWORDS)), re.IGNORECASE
+    )
+
+    WHITESPACE_PATTERN = re.compile(r"\s+")
+
+    # Location strings that indicate a remote role
+    REMOTE_PATTERN = re.compile(r"\b(?:remote|work from home|wfh|anywhere)\b", re.IGNORECASE)
+
+    # Salary ranges in free text, one alternative per format. Each alternative
+    # has its own (min, max) group pair, so the pair that matched ends at
+    # match.lastindex
+    SALARY_PATTERN = re.compile(
+        "|".join([
+            # $50,000 - $100,000
+            r"\$\s*(\d{1,3}(?:,\d{3})*)\s*(?:-|to)\s*\$?\s*(\d{1,3}(?:,\d{3})*)",
+            # $50K - $100K
+            r"\$\s*(\d+)\s*[kK]\s*(?:-|to)\s*\$?\s*(\d+)\s*[kK]",
+            # 50,000 - 100,000 per year
+            r"(\d{1,3}(?:,\d{3})*)\s*(?:-|to)\s*(\d{1,3}(?:,\d{3})*)\s*(?:per year|annually|/year)",
+        ]),
+        re.IGNORECASE,
+    )
+
+    COMMISSION_PATTERN = re.compile(
+        "("
+        + "|".join([
+            r"\d+(?:\.\d+)?%?\s*(?:-|to)\s*\d+(?:\.\d+)?%?\s*commission",
+            r"commission\s*(?:of\s*)?\d+(?:\.\d+)?%",
+            r"\d+(?:\.\d+)?%\s*(?:commission|per sale|per close)",
+            r"earn\s*\$[\d,]+\s*(?:-|to)\s*\$[\d,]+\s*per\s*(?:deal|sale|close|month)",
+            r"OTE\s*\$[\d,]+(?:k|K)?(?:\s*-\s*\$[\d,]+(?:k|K)?)?",
+            r"uncapped\s*commission",
+        ])
+        + ")",
+        re.IGNORECASE,
+    )
+
+    # Requirements section, starting at the first common header
+    REQUIREMENTS_PATTERN = re.compile(
+        r"((?:requirements?:|qualifications?:|what we'?re looking for:|you have:|must have:|required:)"
+        r".*?)(?=\n\n|\Z|responsibilities|about us|benefits|what we offer)",
+        re.IGNORECASE | re.DOTALL,
+    )
+
     def normalize(self, raw_job: Dict[str, Any]) -> Dict[str, Any]:
         """
         Normalize a raw job from JobSpy to our standard schema.
         """
         # Extract and clean basic fields
-        title = self._clean_text(raw_job.get("title", ""))
-        company = self._clean_text(raw_job.get("company", "Unknown Company"))
-        description = self._clean_text(raw_job.get("description", ""))
-        location = self._normalize_location(raw_job.get("location", "Remote"))
+        title = self._clean_text(self._field(raw_job, "title"))
+        company = self._clean_text(self._field(raw_job, "company", "Unknown Company"))
+        description = self._clean_text(self._field(raw_job, "description"))
+        location = self._normalize_location(self._field(raw_job, "location", "Remote"))
 
         # Determine source
-        site = raw_job.get("site", "").lower()
+        site = self._field(raw_job, "site").lower()
         source = self.SOURCE_MAP.get(site, "DIRECT")
 
         # Extract salary information
@@ -77,9 +149,10 @@ class JobNormalizer:
             "requirements": self._extract_requirements(description),
             "location": location,
             "source": source,
-            "source_url": raw_job.get("job_url"),
-            "application_url": raw_job.get("job_url"),
-            "fingerprint": raw_job.get("_fingerprint", self._create_fingerprint(title, company, location)),
+            "source_url": self._field(raw_job, "job_url", None),
+            "application_url": self._field(raw_job, "job_url", None),
+            "fingerprint": self._field(raw_job, "_fingerprint")
+            or self._create_fingerprint(JobKey.from_fields(title, company, location)),
             "job_type": job_type,
             "salary_min": salary_min,
             "salary_max": salary_max,
@@ -89,18 +162,212 @@ class JobNormalizer:
 
         return normalized
 
+    def normalize_batch(self, raw_jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Normalize a list of raw JobSpy jobs in one vectorized pass.
+        Equivalent to [self.normalize(job) for job in raw_jobs].
+        """
+        if not raw_jobs:
+            return []
+        return self.normalize_frame(pd.DataFrame(raw_jobs)).to_dict(orient="records")
+
+    async def normalize_batch_parallel(
+        self,
+        raw_jobs: List[Dict[str, Any]],
+        executor: Executor,
+        chunk_size: int = 500,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run normalize_batch over chunks of raw_jobs in the given executor,
+        typically a ProcessPoolExecutor, so CPU-bound normalization runs
+        off the event loop and across cores. Output order matches input.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = [raw_jobs[i:i + chunk_size] for i in range(0, len(raw_jobs), chunk_size)]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, self.normalize_batch, chunk) for chunk in chunks)
+        )
+        return [job for chunk in results for job in chunk]
+
+    def normalize_frame(self, jobs_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Normalize a DataFrame of raw JobSpy jobs column-wise.
+        Produces the same fields as normalize(), one row per job, with
+        missing values as None so rows can go straight to the database.
+        """
+        def column(name: str, default: str = "") -> pd.Series:
+            if name not in jobs_df:
+                return pd.Series(default, index=jobs_df.index, dtype=object)
+            return jobs_df[name].fillna(default).astype(str)
+
+        # Extract and clean basic fields
+        title = self._clean_series(column("title"))
+        company = self._clean_series(column("company", "Unknown Company"))
+        raw_description = column("description")
+        description = self._clean_series(raw_description)
+        location = self._normalize_location_series(column("location", "Remote"))
+
+        # Determine source
+        source = column("site").str.lower().map(self.SOURCE_MAP).fillna("DIRECT")
+
+        salary_min, salary_max = self._extract_salary_series(jobs_df, raw_description)
+        job_type = self._determine_job_type_series(column("job_type"), description, salary_min)
+
+        # Fall back to our own fingerprint for jobs the collector didn't tag
+        key = (title + "|" + company + "|" + location).str.lower()
+        fingerprint = key.map(xxhash.xxh3_128_hexdigest)
+        if "_fingerprint" in jobs_df:
+            fingerprint = jobs_df["_fingerprint"].fillna(fingerprint)
+
+        job_url = jobs_df["job_url"] if "job_url" in jobs_df else None
+        posted_at = (
+            jobs_df["date_posted"].map(self._parse_date) if "date_posted" in jobs_df else None
+        )
+
+        normalized = pd.DataFrame(
+            {
+                "title": title,
+                "company_name": company,
+                "description": description,
+                "requirements": description.str.extract(self.REQUIREMENTS_PATTERN)[0].str.strip(),
+                "location": location,
+                "source": source,
+                "source_url": job_url,
+                "application_url": job_url,
+                "fingerprint": fingerprint,
+                "job_type": job_type,
+                "salary_min": salary_min.astype("Int64"),
+                "salary_max": salary_max.astype("Int64"),
+                "commission_info": description.str.extract(self.COMMISSION_PATTERN)[0].str.strip(),
+                "posted_at": posted_at,
+            },
+            index=jobs_df.index,
+        )
+
+        return normalized.astype(object).where(normalized.notna(), None)
+
+    def _clean_series(self, text: pd.Series) -> pd.Series:
+        """Column-wise equivalent of _clean_text"""
+        has_html = text.str.contains("<", regex=False)
+        if has_html.any():
+            text = text.copy()
+            text[has_html] = text[has_html].map(self._strip_html)
+        return text.str.replace(self.WHITESPACE_PATTERN, " ", regex=True).str.strip()
+
+    def _normalize_location_series(self, location: pd.Series) -> pd.Series:
+        """Column-wise equivalent of _normalize_location"""
+        location = location.str.strip()
+        location_lower = location.str.lower()
+        is_remote = location.str.contains(self.REMOTE_PATTERN, regex=True)
+
+        conditions = [
+            location == "",
+            is_remote & location_lower.str.contains("us", regex=False),
+            is_remote & location_lower.str.contains("worldwide|global", regex=True),
+            is_remote,
+        ]
+        choices = ["Remote", "Remote - US", "Remote - Worldwide", "Remote"]
+        return pd.Series(np.select(conditions, choices, default=location), index=location.index)
+
+    def _extract_salary_series(
+        self, jobs_df: pd.DataFrame, description: pd.Series
+    ) -> tuple[pd.Series, pd.Series]:
+        """Column-wise equivalent of _extract_salary, as float Series with NaN for missing"""
+        def amount(name: str) -> pd.Series:
+            if name not in jobs_df:
+                return pd.Series(np.nan, index=jobs_df.index)
+            values = np.trunc(pd.to_numeric(jobs_df[name], errors="coerce"))
+            return values.where(values != 0)
+
+        # Try to get from explicit fields
+        salary_min = amount("min_amount")
+        salary_max = amount("max_amount")
+
+        # If no explicit salary, try to parse from description
+        unresolved = salary_min.isna() & salary_max.isna()
+        if unresolved.any():
+            found = description[unresolved].str.extract(self.SALARY_PATTERN)
+            # One (min, max) column pair per alternative; only the matched pair is set
+            for i in range(0, found.shape[1], 2):
+                pair = found[[i, i + 1]].dropna()
+                if pair.empty:
+                    continue
+
+                low = pair[i].str.replace(",", "", regex=False).astype(float)
+                high = pair[i + 1].str.replace(",", "", regex=False).astype(float)
+
+                # If values look like K notation
+                salary_min.loc[pair.index] = low.where(low >= 1000, low * 1000)
+                salary_max.loc[pair.index] = high.where(high >= 1000, high * 1000)
+
+        # Normalize to yearly if needed
+        if "interval" in jobs_df:
+            interval = jobs_df["interval"].fillna("").astype(str).str.lower()
+            multiplier = interval.map({"hourly": 2080, "monthly": 12}).fillna(1)
+            scale = salary_min.fillna(0) != 0
+            salary_min = salary_min.where(~scale, salary_min * multiplier)
+            salary_max = salary_max.where(~scale, salary_max * multiplier)
+
+        return salary_min, salary_max
+
+    def _determine_job_type_series(
+        self,
+        source_job_type: pd.Series,
+        description: pd.Series,
+        salary_min: pd.Series,
+    ) -> pd.Series:
+        """Column-wise equivalent of _determine_job_type"""
+        source_job_type = source_job_type.str.lower()
+
+        # Same precedence as _determine_job_type: first true condition wins
+        conditions = [
+            description.str.contains(self.COMMISSION_ONLY_PATTERN, regex=True),
+            description.str.contains(self.BASE_PLUS_COMMISSION_PATTERN, regex=True),
+            source_job_type.str.contains("contract", regex=False),
+            source_job_type.str.contains("part", regex=False),
+            salary_min.fillna(0) > 20000,
+        ]
+        choices = [
+            "COMMISSION_ONLY",
+            "BASE_PLUS_COMMISSION",
+            "CONTRACT",
+            "PART_TIME",
+            "BASE_PLUS_COMMISSION",
+        ]
+        return pd.Series(
+            np.select(conditions, choices, default="FULL_TIME"), index=description.index
+        )
+
+    @staticmethod
+    def _field(raw_job: Dict[str, Any], name: str, default: Optional[str] = "") -> Optional[str]:
+        """
+        A raw job field as text, with None and NaN treated as missing,
+        matching how normalize_frame fills columns.
+        """
+        value = raw_job.get(name)
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return default
+        return str(value)
+
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text content"""
         if not text:
             return ""
 
-        # Remove excessive whitespace
-        text = re.sub(r"\s+", " ", str(text))
+        text = str(text)
 
         # Remove HTML tags if present
-        text = re.sub(r"<[^>]+>", "", text)
+        if "<" in text:
+            text = self._strip_html(text)
+
+        # Remove excessive whitespace
+        return self.WHITESPACE_PATTERN.sub(" ", text).strip()
 
-        return text.strip()
+    def _strip_html(self, text: str) -> str:
+        """Visible text of an HTML fragment, with entities decoded"""
+        tree = LexborHTMLParser(text)
+        tree.strip_tags(["script", "style"])
+        return tree.text(separator=" ")
 
     def _normalize_location(self, location: str) -> str:
         """Normalize location to standard format"""
@@ -110,21 +377,13 @@ class JobNormalizer:
         location = location.strip()
 
         # Check for remote indicators
-        remote_patterns = [
-            r"\bremote\b",
-            r"\bwork from home\b",
-            r"\bwfh\b",
-            r"\banywhere\b",
-        ]
-
-        for pattern in remote_patterns:
-            if re.search(pattern, location, re.IGNORECASE):
-                # Extract any location qualifier
-                if "us" in location.lower() or "usa" in location.lower():
-                    return "Remote - US"
-                if "worldwide" in location.lower() or "global" in location.lower():
-                    return "Remote - Worldwide"
-                return "Remote"
+        if self.REMOTE_PATTERN.search(location):
+            # Extract any location qualifier
+            if "us" in location.lower() or "usa" in location.lower():
+                return "Remote - US"
+            if "worldwide" in location.lower() or "global" in location.lower():
+                return "Remote - Worldwide"
+            return "Remote"
 
         return location
 
@@ -148,11 +407,11 @@ class JobNormalizer:
 
         # If no explicit salary, try to parse from description
         if not salary_min and not salary_max:
-            description = raw_job.get("description", "")
+            description = self._field(raw_job, "description")
             salary_min, salary_max = self._parse_salary_from_text(description)
 
         # Normalize to yearly if needed
-        interval = raw_job.get("interval", "").lower()
+        interval = self._field(raw_job, "interval").lower()
         if interval == "hourly" and salary_min:
             salary_min = salary_min * 2080  # 40 hrs * 52 weeks
             if salary_max:
@@ -166,55 +425,25 @@ class JobNormalizer:
 
     def _parse_salary_from_text(self, text: str) -> tuple[Optional[int], Optional[int]]:
         """Parse salary range from text content"""
-        # Patterns for salary ranges
-        patterns = [
-            # $50,000 - $100,000
-            r"\$\s*(\d{1,3}(?:,\d{3})*)\s*(?:-|to)\s*\$?\s*(\d{1,3}(?:,\d{3})*)",
-            # $50K - $100K
-            r"\$\s*(\d+)\s*[kK]\s*(?:-|to)\s*\$?\s*(\d+)\s*[kK]",
-            # 50,000 - 100,000 per year
-            r"(\d{1,3}(?:,\d{3})*)\s*(?:-|to)\s*(\d{1,3}(?:,\d{3})*)\s*(?:per year|annually|/year)",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    min_val = match.group(1).replace(",", "")
-                    max_val = match.group(2).replace(",", "")
+        match = self.SALARY_PATTERN.search(text)
+        if not match:
+            return None, None
 
-                    salary_min = int(min_val)
-                    salary_max = int(max_val)
+        salary_min = int(match.group(match.lastindex - 1).replace(",", ""))
+        salary_max = int(match.group(match.lastindex).replace(",", ""))
 
-                    # If values look like K notation
-                    if salary_min < 1000:
-                        salary_min *= 1000
-                    if salary_max < 1000:
-                        salary_max *= 1000
+        # If values look like K notation
+        if salary_min < 1000:
+            salary_min *= 1000
+        if salary_max < 1000:
+            salary_max *= 1000
 
-                    return salary_min, salary_max
-                except (ValueError, IndexError):
-                    continue
-
-        return None, None
+        return salary_min, salary_max
 
     def _extract_commission_info(self, description: str) -> Optional[str]:
         """Extract commission-related information from description"""
-        commission_patterns = [
-            r"(\d+(?:\.\d+)?%?\s*(?:-|to)\s*\d+(?:\.\d+)?%?\s*commission)",
-            r"(commission\s*(?:of\s*)?\d+(?:\.\d+)?%)",
-            r"(\d+(?:\.\d+)?%\s*(?:commission|per sale|per close))",
-            r"(earn\s*\$[\d,]+\s*(?:-|to)\s*\$[\d,]+\s*per\s*(?:deal|sale|close|month))",
-            r"(OTE\s*\$[\d,]+(?:k|K)?(?:\s*-\s*\$[\d,]+(?:k|K)?)?)",
-            r"(uncapped\s*commission)",
-        ]
-
-        for pattern in commission_patterns:
-            match = re.search(pattern, description, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-
-        return None
+        match = self.COMMISSION_PATTERN.search(description)
+        return match.group(1).strip() if match else None
 
     def _determine_job_type(
         self,
@@ -223,20 +452,16 @@ class JobNormalizer:
         salary_min: Optional[int]
     ) -> str:
         """Determine the job type based on available information"""
-        description_lower = description.lower()
-
         # Check for commission only keywords
-        for keyword in self.COMMISSION_ONLY_KEYWORDS:
-            if keyword in description_lower:
-                return "COMMISSION_ONLY"
+        if self.COMMISSION_ONLY_PATTERN.search(description):
+            return "COMMISSION_ONLY"
 
         # Check for base plus commission keywords
-        for keyword in self.BASE_PLUS_COMMISSION_KEYWORDS:
-            if keyword in description_lower:
-                return "BASE_PLUS_COMMISSION"
+        if self.BASE_PLUS_COMMISSION_PATTERN.search(description):
+            return "BASE_PLUS_COMMISSION"
 
         # Check job type field from source
-        job_type = raw_job.get("job_type", "").lower()
+        job_type = self._field(raw_job, "job_type").lower()
         if "contract" in job_type:
             return "CONTRACT"
         if "part" in job_type:
@@ -251,23 +476,8 @@ class JobNormalizer:
 
     def _extract_requirements(self, description: str) -> Optional[str]:
         """Extract requirements section from description"""
-        # Common section headers
-        headers = [
-            r"requirements?:",
-            r"qualifications?:",
-            r"what we'?re looking for:",
-            r"you have:",
-            r"must have:",
-            r"required:",
-        ]
-
-        for header in headers:
-            pattern = rf"({header}.*?)(?=\n\n|\Z|responsibilities|about us|benefits|what we offer)"
-            match = re.search(pattern, description, re.IGNORECASE | re.DOTALL)
-            if match:
-                return match.group(1).strip()
-
-        return None
+        match = self.REQUIREMENTS_PATTERN.search(description)
+        return match.group(1).strip() if match else None
 
     def _parse_date(self, date_str: Any) -> Optional[datetime]:
         """Parse date from various formats"""
@@ -277,28 +487,25 @@ class JobNormalizer:
         if isinstance(date_str, datetime):
             return date_str
 
-        try:
-            # Try common formats
-            formats = [
-                "%Y-%m-%d",
-                "%Y-%m-%dT%H:%M:%S",
-                "%Y-%m-%dT%H:%M:%SZ",
-                "%m/%d/%Y",
-            ]
-
-            for fmt in formats:
-                try:
-                    return datetime.strptime(str(date_str), fmt)
-                except ValueError:
-                    continue
+        # JobSpy hands back plain dates
+        if isinstance(date_str, date):
+            return datetime(date_str.year, date_str.month, date_str.day)
 
-            return None
+        try:
+            # ISO 8601 first, then the one US format we see
+            text = str(date_str)
+            try:
+                parsed = datetime.fromisoformat(text)
+            except ValueError:
+                return datetime.strptime(text, "%m/%d/%Y")
+
+            # Keep timestamps naive UTC, as "...Z" strings used to parse
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
         except Exception:
             return None
 
-    def _create_fingerprint(self, title: str, company: str, location: str) -> str:
+    def _create_fingerprint(self, key: JobKey) -> str:
         """Create fingerprint for deduplication"""
-        import hashlib
-
-        combined = f"{title.lower().strip()}|{company.lower().strip()}|{location.lower().strip()}"
-        return hashlib.md5(combined.encode()).hexdigest()
+        return xxhash.xxh3_128_hexdigest("|".join((key.title_lc, key.company_lc, key.location_lc)))